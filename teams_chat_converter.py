@@ -1,11 +1,511 @@
+import openpyxl
 import pandas as pd
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from pathlib import Path
 from datetime import datetime
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 import logging
+import mmap
+import os
 import re
 from typing import Tuple, List, Dict
-import hashlib
+from urllib.parse import urlparse
+
+try:
+    from lxml import etree as lxml_etree
+    DEFAULT_PARSER = "lxml"
+except ImportError:  # pragma: no cover
+    lxml_etree = None
+    DEFAULT_PARSER = "html.parser"
+
+try:
+    import xxhash
+except ImportError:  # pragma: no cover
+    xxhash = None
+
+try:
+    from datasketch import MinHash, MinHashLSH
+except ImportError:  # pragma: no cover
+    MinHash = MinHashLSH = None
+
+try:
+    import xlsxwriter  # noqa: F401
+    EXCEL_ENGINE = "xlsxwriter"
+except ImportError:  # pragma: no cover
+    EXCEL_ENGINE = "openpyxl"
+
+try:
+    import ahocorasick
+except ImportError:  # pragma: no cover
+    ahocorasick = None
+
+
+_STRAINER_CLASS_PATTERN = re.compile(r"message-wrapper|chat-title|threaded-chat", re.I)
+
+# Compiled once at import instead of per message/row; these run in the
+# hottest part of the extraction loop.
+_RE_CHAT_TITLE = re.compile(r"chat-title", re.I)
+_RE_CHAT_LABEL = re.compile(r"chat-label|chat-header", re.I)
+_RE_CHAT_DATA = re.compile(r"chat-data", re.I)
+_RE_MESSAGE_ID = re.compile(r"message(\d+)", re.I)
+_RE_MESSAGE_SENDER = re.compile(r"message-sender", re.I)
+_RE_MESSAGE_DATE = re.compile(r"message-date", re.I)
+_RE_MESSAGE_TEXT = re.compile(r"message-text", re.I)
+_RE_MESSAGE_BUBBLE = re.compile(r"(sent|received|unknown-direction)-message", re.I)
+# Matched against each class token individually by find_all(class_=...),
+# so anchored rather than word-bounded.
+_RE_WRAPPER_CLASS = re.compile(r"^(?:sent|received|unknown-direction)-message-wrapper$")
+
+# Single character-class scan instead of per-character alternation; one
+# compiled pattern shared by every message.
+_RE_URL = re.compile(r"https?://[A-Za-z0-9$\-_@.&+!*(),/%?#=:;~'\[\]]+")
+
+# Whitespace collapsing for label normalization and near-duplicate
+# shingling; compiled here so the hot paths skip the re-module cache probe.
+_RE_WHITESPACE = re.compile(r"\s+")
+
+# Tuples so str.endswith can test every extension in a single C call.
+_DOC_EXTENSIONS = (".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx")
+_MEDIA_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".mp4", ".mp3")
+_FILE_SHARING_DOMAINS = ("dropbox.com", "box.com", "drive.google.com")
+_MEETING_DOMAINS = ("zoom.us", "meet.google.com", "webex.com")
+
+# Needle -> (priority, category), priorities preserving the if-chain
+# order in _classify_url. With pyahocorasick installed, all domain rules
+# are tested in a single DFA sweep over the netloc instead of one
+# substring scan per rule.
+_DOMAIN_CATEGORIES = (
+    [("sharepoint.com", "SharePoint"), ("teams.microsoft.com", "Teams")]
+    + [(d, "File Sharing") for d in _FILE_SHARING_DOMAINS]
+    + [(d, "Meeting") for d in _MEETING_DOMAINS]
+)
+
+if ahocorasick is not None:
+    _DOMAIN_AUTOMATON = ahocorasick.Automaton()
+    for _priority, (_needle, _category) in enumerate(_DOMAIN_CATEGORIES):
+        _DOMAIN_AUTOMATON.add_word(_needle, (_priority, _category))
+    _DOMAIN_AUTOMATON.make_automaton()
+else:  # pragma: no cover
+    _DOMAIN_AUTOMATON = None
+
+_EXTENSION_TYPES = {
+    "Document": _DOC_EXTENSIONS,
+    "Media": _MEDIA_EXTENSIONS,
+    "Archive": (".zip", ".rar", ".7z"),
+    "Text": (".txt", ".csv", ".log"),
+}
+# Inverted ext -> type map: one suffix split plus one dict lookup per
+# filename instead of an endswith scan per category.
+_EXT_TO_TYPE = {ext: typ for typ, exts in _EXTENSION_TYPES.items() for ext in exts}
+
+
+def _get_file_type(filename: str) -> str:
+    dot = filename.rfind(".")
+    if dot == -1:
+        return "Other"
+    return _EXT_TO_TYPE.get(filename[dot:].lower(), "Other")
+
+
+def _extract_filename_from_url(url: str, parsed=None) -> str:
+    if parsed is None:
+        parsed = urlparse(url)
+    name = parsed.path.rsplit("/", 1)[-1]
+    return name if "." in name else ""
+
+
+def _classify_url(url: str, parsed=None) -> str:
+    """Bucket a URL for review: platform, file sharing, meeting, or file type."""
+    if parsed is None:
+        parsed = urlparse(url)
+
+    domain = parsed.netloc.lower()
+    path = parsed.path.lower()
+
+    if _DOMAIN_AUTOMATON is not None:
+        # min() over (priority, category) keeps the same precedence as
+        # the substring if-chain below.
+        hit = min((value for _, value in _DOMAIN_AUTOMATON.iter(domain)), default=None)
+        if hit is not None:
+            return hit[1]
+    else:
+        if "sharepoint.com" in domain:
+            return "SharePoint"
+        if "teams.microsoft.com" in domain:
+            return "Teams"
+        if any(d in domain for d in _FILE_SHARING_DOMAINS):
+            return "File Sharing"
+        if any(d in domain for d in _MEETING_DOMAINS):
+            return "Meeting"
+    if path.endswith(_DOC_EXTENSIONS):
+        return "Document"
+    if path.endswith(_MEDIA_EXTENSIONS):
+        return "Media"
+    return "Web"
+
+
+def _strainer_match(name, attrs):
+    """Parse-time filter: keep only tags the converter actually reads."""
+    if name in ("table", "tr", "td"):
+        return True
+    if attrs.get("id") == "container":
+        return True
+    classes = attrs.get("class", "")
+    if isinstance(classes, (list, tuple)):
+        classes = " ".join(classes)
+    return bool(classes and _STRAINER_CLASS_PATTERN.search(classes))
+
+
+MESSAGE_STRAINER = SoupStrainer(_strainer_match)
+
+# Row layout produced by _extract_message_data, declared up front so
+# DataFrame construction skips column inference (and empty frames still
+# carry the schema).
+_ROW_COLUMNS = [
+    "index",
+    "message_id",
+    "raw_timestamp",
+    "timestamp",
+    "sender",
+    "recipients",
+    "message",
+    "urls",
+    "url_types",
+    "attachments",
+    "attachment_types",
+    "conversation_title",
+    "conversation_participants",
+    "participant_count",
+    "local_user",
+    "message_count",
+    "conversation_first_timestamp",
+    "conversation_last_timestamp",
+    "case_time_zone",
+    "source_file",
+]
+
+# Columns that define message identity for deduplication (the fields the
+# old per-row MD5 was built from).
+_DEDUP_COLUMNS = ["message_id", "raw_timestamp", "sender", "message"]
+
+
+def _dedup_hash_parts(message_id: str, raw_timestamp: str, sender: str, message: str) -> int:
+    """64-bit digest over the _DEDUP_COLUMNS fields for the in-parse seen set.
+
+    Prefers xxh3 for the same reasons as _hash_rows: fast, and stable
+    across runs and processes (unlike the salted built-in hash). Fields
+    are joined with a unit separator to keep boundaries unambiguous.
+    """
+    if xxhash is not None:
+        joined = "\x1f".join((message_id, raw_timestamp, sender, message))
+        return xxhash.xxh3_64_intdigest(joined.encode("utf-8"))
+    return hash((message_id, raw_timestamp, sender, message))
+
+
+def _row_dedup_hash(row: Dict) -> int:
+    return _dedup_hash_parts(row["message_id"], row["raw_timestamp"], row["sender"], row["message"])
+
+
+# Returned by the extractors when the identity fields match an already
+# seen message, so callers can count the duplicate without a row dict,
+# URL scan, or urlparse ever being built for it.
+_DUPLICATE_ROW = object()
+
+# Output column order for the Messages sheet; the combined-folder export
+# prepends global_sequence.
+_EXPORT_COLUMNS = [
+    "sender",
+    "recipients",
+    "message",
+    "urls",
+    "url_types",
+    "attachments",
+    "attachment_types",
+    "timestamp",
+    "message_id",
+    "source_file",
+    "parsed_timestamp",
+    "timestamp_parse_status",
+    "timestamp_drift_flag",
+    "timestamp_drift_detail",
+    "timestamp_drift_seconds",
+    "near_duplicate_flag",
+    "near_duplicate_of",
+    "message_hash",
+    "conversation_title",
+    "conversation_participants",
+    "participant_count",
+    "local_user",
+    "message_count",
+    "conversation_first_timestamp",
+    "conversation_last_timestamp",
+    "case_time_zone",
+    "index",
+    "raw_timestamp",
+]
+
+
+def _prepare_export_df(df: pd.DataFrame, preferred_columns: List[str]) -> pd.DataFrame:
+    export_df = df.copy()
+
+    if "parsed_timestamp" in export_df.columns:
+        export_df["parsed_timestamp"] = export_df["parsed_timestamp"].fillna("")
+
+    if "timestamp" in export_df.columns:
+        ts = pd.to_datetime(export_df["timestamp"], errors="coerce")
+        export_df["timestamp"] = ts.dt.strftime("%Y-%m-%d %H:%M:%S").fillna(export_df["timestamp"])
+
+    existing_columns = [c for c in preferred_columns if c in export_df.columns]
+    return export_df[existing_columns]
+
+
+def _write_workbook(output_file, sheets: List[Tuple[str, pd.DataFrame]]) -> None:
+    """Write (sheet_name, frame) pairs, streaming rows to disk.
+
+    With xlsxwriter installed, constant_memory streams each row instead
+    of holding the full worksheet in memory, and strings_to_urls skips
+    per-cell URL conversion on the link-heavy columns. Otherwise rows
+    are appended to an openpyxl write-only workbook, which serializes
+    them straight to the archive rather than retaining Cell objects
+    (pandas' own openpyxl writer cannot drive write-only sheets, hence
+    the direct append loop).
+    """
+    if EXCEL_ENGINE == "xlsxwriter":
+        # Rows must be written strictly top-to-bottom: constant_memory
+        # flushes each finished row, and pandas' to_excel emits cells
+        # column-major, which that mode silently drops. Hence the direct
+        # write_row loop instead of the pandas writer.
+        workbook = xlsxwriter.Workbook(
+            str(output_file), {"constant_memory": True, "strings_to_urls": False}
+        )
+        for sheet_name, frame in sheets:
+            worksheet = workbook.add_worksheet(sheet_name)
+            worksheet.write_row(0, 0, [str(c) for c in frame.columns])
+            for r, row in enumerate(frame.itertuples(index=False, name=None), 1):
+                worksheet.write_row(r, 0, ["" if pd.isna(value) else value for value in row])
+        workbook.close()
+        return
+
+    workbook = openpyxl.Workbook(write_only=True)
+    for sheet_name, frame in sheets:
+        worksheet = workbook.create_sheet(sheet_name)
+        worksheet.append(list(frame.columns))
+        for row in frame.itertuples(index=False, name=None):
+            worksheet.append(["" if pd.isna(value) else value for value in row])
+    workbook.save(output_file)
+
+
+def _hash_rows(frame: pd.DataFrame) -> pd.Series:
+    """Per-row audit hash over the identity columns.
+
+    Prefers xxh3 when xxhash is installed: it is much faster than md5 and
+    the digest depends only on the message content, so it is reproducible
+    across runs and pandas versions. Fields are joined with a unit
+    separator so "ab"+"cd" and "a"+"bcd" cannot collide. Falls back to
+    pandas' vectorized hasher otherwise.
+    """
+    if xxhash is not None:
+        joined = frame.astype(str).agg("\x1f".join, axis=1)
+        return joined.map(lambda s: xxhash.xxh3_64_hexdigest(s.encode("utf-8")))
+    return pd.util.hash_pandas_object(frame, index=False).map("{:016x}".format)
+
+
+# =========================
+# MESSAGE EXTRACTION
+# =========================
+# Module-level (rather than methods) so process-pool workers can run the
+# extraction on re-parsed wrapper fragments without pickling a converter.
+def _extract_fields(element) -> Dict:
+    """Single pass over the subtree instead of one find() per field."""
+    fields = {
+        "sender": None,
+        "date": None,
+        "text": None,
+        "bubble": None,
+        "anchors": [],
+        "input_value": "",
+        "nested_id": "",
+    }
+
+    for node in element.descendants:
+        name = getattr(node, "name", None)
+        if not name:
+            continue
+
+        if name == "a" and node.has_attr("href"):
+            fields["anchors"].append(node)
+        elif name == "input" and not fields["input_value"]:
+            fields["input_value"] = (node.get("value") or "").strip()
+
+        if not fields["nested_id"]:
+            fields["nested_id"] = (node.get("id") or "").strip()
+
+        classes = node.get("class")
+        if not classes:
+            continue
+        class_text = " ".join(classes)
+
+        if fields["sender"] is None and _RE_MESSAGE_SENDER.search(class_text):
+            fields["sender"] = node
+        if fields["date"] is None and _RE_MESSAGE_DATE.search(class_text):
+            fields["date"] = node
+        if fields["text"] is None and _RE_MESSAGE_TEXT.search(class_text):
+            fields["text"] = node
+        if fields["bubble"] is None and _RE_MESSAGE_BUBBLE.search(class_text):
+            fields["bubble"] = node
+
+    return fields
+
+
+def _extract_message_id(element, fields: Dict) -> str:
+    raw_id = (element.get("id") or "").strip()
+
+    if raw_id:
+        match = _RE_MESSAGE_ID.search(raw_id)
+        if match:
+            return match.group(1)
+        return raw_id
+
+    if fields["input_value"]:
+        return fields["input_value"]
+
+    if fields["nested_id"]:
+        match = _RE_MESSAGE_ID.search(fields["nested_id"])
+        if match:
+            return match.group(1)
+        return fields["nested_id"]
+
+    return ""
+
+
+def _extract_urls(element, anchors: List) -> List[str]:
+    urls = []
+    seen = set()
+
+    for anchor in anchors:
+        href = (anchor.get("href") or "").strip()
+        if href.startswith(("http://", "https://")) and href not in seen:
+            seen.add(href)
+            urls.append(href)
+
+    # Walk text nodes lazily rather than concatenating the subtree with
+    # get_text(): no merged-blob allocation, and the per-node substring
+    # check is a C memmem scan that short-circuits the many nodes
+    # carrying no URL. A URL never spans nodes (get_text joined them
+    # with spaces anyway), so the matches are identical.
+    for text in element.strings:
+        if "http" not in text:
+            continue
+        for match in _RE_URL.finditer(text):
+            url = match.group(0)
+            if url not in seen:
+                seen.add(url)
+                urls.append(url)
+
+    return urls
+
+
+def _extract_attachments(urls: List[str], parsed_urls: List = None) -> List[str]:
+    if parsed_urls is None:
+        parsed_urls = [urlparse(u) for u in urls]
+    attachments = []
+    for url, parsed in zip(urls, parsed_urls):
+        filename = _extract_filename_from_url(url, parsed)
+        if filename and _get_file_type(filename) != "Other":
+            attachments.append(filename)
+    return attachments
+
+
+def _build_row(
+    index: int,
+    metadata: Dict[str, str],
+    message_id: str,
+    raw_timestamp: str,
+    sender_text: str,
+    message_text: str,
+    urls: List[str],
+    attachments: List[str],
+    parsed_urls: List,
+    source_file: str,
+) -> Dict:
+    return {
+        "index": index,
+        "message_id": message_id,
+        "raw_timestamp": raw_timestamp if raw_timestamp else "",
+        "timestamp": raw_timestamp if raw_timestamp else "",
+        "sender": sender_text,
+        "recipients": metadata.get("conversation_participants", ""),
+        "message": message_text,
+        "urls": "; ".join(urls),
+        "url_types": "; ".join(_classify_url(u, p) for u, p in zip(urls, parsed_urls)),
+        "attachments": "; ".join(attachments),
+        "attachment_types": "; ".join(_get_file_type(a) for a in attachments),
+        "conversation_title": metadata.get("conversation_title", ""),
+        "conversation_participants": metadata.get("conversation_participants", ""),
+        "participant_count": metadata.get("participant_count", ""),
+        "local_user": metadata.get("local_user", ""),
+        "message_count": metadata.get("message_count", ""),
+        "conversation_first_timestamp": metadata.get("conversation_first_timestamp", ""),
+        "conversation_last_timestamp": metadata.get("conversation_last_timestamp", ""),
+        "case_time_zone": metadata.get("case_time_zone", ""),
+        "source_file": source_file,
+    }
+
+
+def _extract_message_data(element, index: int, metadata: Dict[str, str], source_file: str, seen_keys: set = None):
+    fields = _extract_fields(element)
+
+    message_id = _extract_message_id(element, fields)
+    raw_timestamp = fields["date"].get_text(" ", strip=True) if fields["date"] else ""
+
+    sender_text = fields["sender"].get_text(" ", strip=True) if fields["sender"] else "Unknown"
+
+    if fields["text"] is not None:
+        message_text = fields["text"].get_text(" ", strip=True)
+    elif fields["bubble"] is not None:
+        message_text = fields["bubble"].get_text(" ", strip=True)
+    else:
+        message_text = ""
+
+    if not any([message_id, raw_timestamp, sender_text, message_text]):
+        return None
+
+    # Dedup on the cheap identity fields before any URL scanning or row
+    # assembly; duplicates bail here having paid only the field walk.
+    if seen_keys is not None:
+        key = _dedup_hash_parts(message_id, raw_timestamp, sender_text, message_text)
+        if key in seen_keys:
+            return _DUPLICATE_ROW
+        seen_keys.add(key)
+
+    urls = _extract_urls(element, fields["anchors"])
+    # One urlparse per URL, shared by attachment extraction and
+    # classification below.
+    parsed_urls = [urlparse(u) for u in urls]
+    attachments = _extract_attachments(urls, parsed_urls)
+
+    row = _build_row(index, metadata, message_id, raw_timestamp, sender_text, message_text, urls, attachments, parsed_urls, source_file)
+    return len(urls), len(attachments), row
+
+
+def _extract_fragment_batch(args) -> List:
+    """Process-pool worker: re-parse serialized wrappers, extract rows.
+
+    Receives (fragments, start_index, metadata, source_file); returns a
+    list of (index, extracted, error) triples so the parent can keep its
+    per-message error accounting.
+    """
+    fragments, start_index, metadata, source_file = args
+    results = []
+    for offset, fragment in enumerate(fragments):
+        index = start_index + offset
+        try:
+            soup = BeautifulSoup(fragment, DEFAULT_PARSER)
+            element = soup.find("label") or soup
+            results.append((index, _extract_message_data(element, index, metadata, source_file), None))
+        except Exception as e:
+            results.append((index, None, str(e)))
+    return results
 
 
 class TeamsChatConverter:
@@ -31,20 +531,40 @@ class TeamsChatConverter:
         "label.unknown-direction-message-wrapper"
     )
 
-    def __init__(self, html_file: str, output_dir: str = None):
+    # Above this size, parse_html streams the file with lxml iterparse
+    # instead of building the whole tree in memory.
+    STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024
+    # Below this many wrappers, pool startup and fragment pickling cost
+    # more than the serial loop.
+    PARALLEL_EXTRACT_THRESHOLD = 2000
+    PARALLEL_EXTRACT_BATCH = 500
+    # Files between this and the streaming threshold are read via mmap.
+    MMAP_THRESHOLD_BYTES = 8 * 1024 * 1024
+
+    def __init__(self, html_file: str, output_dir: str = None, streaming_threshold_bytes: int = None):
         self.html_file = Path(html_file)
         self.output_dir = Path(output_dir) if output_dir else self.html_file.parent
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
+        if streaming_threshold_bytes is not None:
+            self.STREAMING_THRESHOLD_BYTES = streaming_threshold_bytes
+
         self.log_file = self.output_dir / (
             f"{self.html_file.stem}_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
         )
         self._setup_logging()
 
+        # Per-URL occurrence counts across kept rows, filled at insert
+        # time so frequency output needs no re-scan of the frame.
+        self.url_counts = Counter()
+
         self.stats = {
             "total_messages": 0,
             "duplicates_removed": 0,
             "timestamp_drifts": 0,
+            "near_duplicates": 0,
+            "urls_extracted": 0,
+            "attachments_found": 0,
             "errors": 0,
         }
 
@@ -68,25 +588,317 @@ class TeamsChatConverter:
     # PARSE
     # =========================
     def parse_html(self) -> pd.DataFrame:
-        with open(self.html_file, "r", encoding="utf-8", errors="ignore") as f:
-            soup = BeautifulSoup(f.read(), "html.parser")
+        # Very large exports never need the whole DOM in memory: stream
+        # them element by element instead.
+        file_size = self.html_file.stat().st_size
+        if lxml_etree is not None and file_size > self.STREAMING_THRESHOLD_BYTES:
+            return self._parse_html_streaming()
+
+        # Binary mode: the parser handles encoding detection itself, which
+        # skips a redundant decode pass on multi-MB exports. Mid-size
+        # files come in through mmap so pages fault straight from the
+        # page cache instead of passing through the buffered reader.
+        with open(self.html_file, "rb") as f:
+            if file_size > self.MMAP_THRESHOLD_BYTES:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    html_content = mm.read()
+            else:
+                html_content = f.read()
+
+        # Strained parse only builds the subtrees the converter reads
+        # (metadata table, chat title, message wrappers), which avoids
+        # allocating Tag objects for the rest of the document.
+        soup = BeautifulSoup(html_content, DEFAULT_PARSER, parse_only=MESSAGE_STRAINER)
+        messages = self._find_message_elements(soup)
+
+        if not messages:
+            # Unknown export variant: retry with a full parse so nothing
+            # is lost to the strainer.
+            self.logger.info("Strained parse found no messages, retrying with full parse")
+            soup = BeautifulSoup(html_content, DEFAULT_PARSER)
+            # The strained path never builds script/style subtrees; drop
+            # them here too so downstream walks skip embedded CSS/JS.
+            for tag in soup.find_all(["script", "style", "noscript"]):
+                tag.decompose()
+            messages = self._find_message_elements(soup)
+            if not messages:
+                # Better to stop with an empty frame than to guess at
+                # arbitrary divs and flood the pipeline with noise.
+                self.logger.warning(
+                    f"No message wrappers found in {self.html_file.name}; "
+                    "this export variant is not recognized "
+                    f"(expected {self.MESSAGE_WRAPPER_SELECTOR})"
+                )
 
         metadata = self._extract_chat_metadata(soup)
-        messages = self._find_message_elements(soup)
 
-        rows = []
-        for i, element in enumerate(messages, 1):
-            try:
-                row = self._extract_message_data(element, i, metadata)
-                if row:
-                    rows.append(row)
-            except Exception as e:
-                self.stats["errors"] += 1
-                self.logger.warning(f"Error parsing message {i}: {e}")
-
-        self.stats["total_messages"] = len(rows)
+        # Very message-heavy exports fan the extraction out across a
+        # process pool; serial extraction stays the default because pool
+        # startup and fragment pickling dominate on small inputs.
+        rows = None
+        if len(messages) > self.PARALLEL_EXTRACT_THRESHOLD:
+            rows = self._extract_rows_parallel(messages, metadata)
+
+        if rows is None:
+            # Accumulate counters in locals and flush once after the loop
+            # instead of paying dict/attribute lookups per message.
+            rows = []
+            rows_append = rows.append
+            # Incremental order-preserving dedup: duplicate wrappers are
+            # dropped here rather than retained until remove_duplicates,
+            # so peak memory tracks unique messages only.
+            seen_keys = set()
+            n_extracted = n_duplicates = 0
+            n_urls = n_attachments = n_errors = 0
+            source_file = self.html_file.name
+
+            for i, element in enumerate(messages, 1):
+                try:
+                    extracted = _extract_message_data(element, i, metadata, source_file, seen_keys)
+                    if extracted is _DUPLICATE_ROW:
+                        n_extracted += 1
+                        n_duplicates += 1
+                    elif extracted:
+                        msg_urls, msg_attachments, row = extracted
+                        n_extracted += 1
+                        n_urls += msg_urls
+                        n_attachments += msg_attachments
+                        if msg_urls:
+                            self.url_counts.update(row["urls"].split("; "))
+                        rows_append(row)
+                except Exception as e:
+                    n_errors += 1
+                    self.logger.warning(f"Error parsing message {i}: {e}")
+
+            stats = self.stats
+            stats["total_messages"] = n_extracted
+            stats["duplicates_removed"] += n_duplicates
+            stats["urls_extracted"] += n_urls
+            stats["attachments_found"] += n_attachments
+            stats["errors"] += n_errors
+            if n_duplicates:
+                self.logger.info(f"Dropped {n_duplicates} duplicate messages during parse")
+
         self.logger.info(f"Extracted {len(rows)} messages from {self.html_file.name}")
-        return pd.DataFrame(rows)
+        df = pd.DataFrame.from_records(rows, columns=_ROW_COLUMNS)
+        return self._parse_timestamp_column(df)
+
+    def _extract_rows_parallel(self, messages, metadata: Dict[str, str]):
+        """Fan per-message extraction out over a process pool.
+
+        Wrappers are serialized back to small HTML fragments, batched,
+        and re-parsed in the workers. Returns the row dicts, or None if
+        the pool cannot be used (caller falls back to the serial loop).
+        """
+        source_file = self.html_file.name
+        batch_size = self.PARALLEL_EXTRACT_BATCH
+        batches = [
+            ([str(el) for el in messages[start:start + batch_size]], start + 1, metadata, source_file)
+            for start in range(0, len(messages), batch_size)
+        ]
+
+        rows = []
+        seen_keys = set()
+        url_counts: Counter = Counter()
+        n_extracted = n_duplicates = 0
+        n_urls = n_attachments = n_errors = 0
+        try:
+            with ProcessPoolExecutor() as pool:
+                for results in pool.map(_extract_fragment_batch, batches):
+                    for index, extracted, error in results:
+                        if error is not None:
+                            n_errors += 1
+                            self.logger.warning(f"Error parsing message {index}: {error}")
+                        elif extracted:
+                            msg_urls, msg_attachments, row = extracted
+                            n_extracted += 1
+                            # Workers cannot share the seen-set, so the
+                            # parent dedups their returned rows; URL and
+                            # attachment counts cover kept rows only, as
+                            # in the serial and streaming paths.
+                            key = _row_dedup_hash(row)
+                            if key in seen_keys:
+                                n_duplicates += 1
+                            else:
+                                seen_keys.add(key)
+                                n_urls += msg_urls
+                                n_attachments += msg_attachments
+                                if msg_urls:
+                                    url_counts.update(row["urls"].split("; "))
+                                rows.append(row)
+        except Exception as e:
+            self.logger.warning(f"Parallel extraction unavailable ({e}), using serial loop")
+            return None
+
+        # Counts are flushed only once the pool has drained cleanly: a
+        # mid-stream pool failure falls back to the serial loop, which
+        # recounts every URL from scratch.
+        self.url_counts.update(url_counts)
+        stats = self.stats
+        stats["total_messages"] = n_extracted
+        stats["duplicates_removed"] += n_duplicates
+        stats["urls_extracted"] += n_urls
+        stats["attachments_found"] += n_attachments
+        stats["errors"] += n_errors
+        if n_duplicates:
+            self.logger.info(f"Dropped {n_duplicates} duplicate messages during parse")
+        return rows
+
+    # =========================
+    # STREAMING PARSE
+    # =========================
+    def _parse_html_streaming(self) -> pd.DataFrame:
+        """Stream message wrappers with lxml iterparse.
+
+        Keeps memory at O(one element) on multi-hundred-MB exports:
+        each wrapper is extracted as soon as its end tag is seen, then
+        cleared along with any already-processed siblings. The metadata
+        table sits at the top of the export, so it is read from a bounded
+        head slice with the normal soup path.
+        """
+        self.logger.info(f"Streaming parse (file exceeds {self.STREAMING_THRESHOLD_BYTES} bytes)")
+        metadata = self._extract_metadata_from_head()
+
+        rows = []
+        rows_append = rows.append
+        seen_keys = set()
+        n_extracted = n_duplicates = 0
+        n_urls = n_attachments = n_errors = 0
+        index = 0
+
+        context = lxml_etree.iterparse(str(self.html_file), events=("end",), html=True, tag="label")
+        for _, element in context:
+            classes = element.get("class") or ""
+            if "message-wrapper" in classes:
+                index += 1
+                try:
+                    extracted = self._extract_message_data_streaming(element, index, metadata, seen_keys)
+                    if extracted is _DUPLICATE_ROW:
+                        n_extracted += 1
+                        n_duplicates += 1
+                    elif extracted:
+                        msg_urls, msg_attachments, row = extracted
+                        n_extracted += 1
+                        n_urls += msg_urls
+                        n_attachments += msg_attachments
+                        if msg_urls:
+                            self.url_counts.update(row["urls"].split("; "))
+                        rows_append(row)
+                except Exception as e:
+                    n_errors += 1
+                    self.logger.warning(f"Error parsing message {index}: {e}")
+
+            # Release the processed element and everything before it.
+            element.clear()
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+
+        stats = self.stats
+        stats["total_messages"] = n_extracted
+        stats["duplicates_removed"] += n_duplicates
+        stats["urls_extracted"] += n_urls
+        stats["attachments_found"] += n_attachments
+        stats["errors"] += n_errors
+        if n_duplicates:
+            self.logger.info(f"Dropped {n_duplicates} duplicate messages during parse")
+
+        self.logger.info(f"Extracted {len(rows)} messages from {self.html_file.name} (streaming)")
+        df = pd.DataFrame.from_records(rows, columns=_ROW_COLUMNS)
+        return self._parse_timestamp_column(df)
+
+    def _extract_metadata_from_head(self, max_bytes: int = 512 * 1024) -> Dict[str, str]:
+        with open(self.html_file, "rb") as f:
+            head = f.read(max_bytes)
+        soup = BeautifulSoup(head, DEFAULT_PARSER, parse_only=MESSAGE_STRAINER)
+        return self._extract_chat_metadata(soup)
+
+    def _extract_message_data_streaming(self, element, index: int, metadata: Dict[str, str], seen_keys: set = None):
+        """lxml-element counterpart of _extract_message_data."""
+
+        def text_of(node) -> str:
+            return " ".join(s.strip() for s in node.itertext() if s.strip())
+
+        sender_node = date_node = text_node = bubble_node = None
+        input_value = nested_id = ""
+        urls = []
+        seen = set()
+
+        for node in element.iter():
+            if node is element:
+                continue
+
+            if node.tag == "a":
+                href = (node.get("href") or "").strip()
+                if href.startswith(("http://", "https://")) and href not in seen:
+                    seen.add(href)
+                    urls.append(href)
+            elif node.tag == "input" and not input_value:
+                input_value = (node.get("value") or "").strip()
+
+            if not nested_id:
+                nested_id = (node.get("id") or "").strip()
+
+            classes = node.get("class")
+            if not classes:
+                continue
+
+            if sender_node is None and _RE_MESSAGE_SENDER.search(classes):
+                sender_node = node
+            if date_node is None and _RE_MESSAGE_DATE.search(classes):
+                date_node = node
+            if text_node is None and _RE_MESSAGE_TEXT.search(classes):
+                text_node = node
+            if bubble_node is None and _RE_MESSAGE_BUBBLE.search(classes):
+                bubble_node = node
+
+        raw_id = (element.get("id") or "").strip()
+        if raw_id:
+            match = _RE_MESSAGE_ID.search(raw_id)
+            message_id = match.group(1) if match else raw_id
+        elif input_value:
+            message_id = input_value
+        elif nested_id:
+            match = _RE_MESSAGE_ID.search(nested_id)
+            message_id = match.group(1) if match else nested_id
+        else:
+            message_id = ""
+
+        raw_timestamp = text_of(date_node) if date_node is not None else ""
+        sender_text = text_of(sender_node) if sender_node is not None else "Unknown"
+
+        if text_node is not None:
+            message_text = text_of(text_node)
+        elif bubble_node is not None:
+            message_text = text_of(bubble_node)
+        else:
+            message_text = ""
+
+        if not any([message_id, raw_timestamp, sender_text, message_text]):
+            return None
+
+        # Same early dedup as _extract_message_data: duplicates skip the
+        # full-text URL scan, urlparse calls and row assembly.
+        if seen_keys is not None:
+            key = _dedup_hash_parts(message_id, raw_timestamp, sender_text, message_text)
+            if key in seen_keys:
+                return _DUPLICATE_ROW
+            seen_keys.add(key)
+
+        full_text = text_of(element)
+        if "http" in full_text:
+            for match in _RE_URL.finditer(full_text):
+                url = match.group(0)
+                if url not in seen:
+                    seen.add(url)
+                    urls.append(url)
+
+        parsed_urls = [urlparse(u) for u in urls]
+        attachments = _extract_attachments(urls, parsed_urls)
+
+        row = _build_row(index, metadata, message_id, raw_timestamp, sender_text, message_text, urls, attachments, parsed_urls, self.html_file.name)
+        return len(urls), len(attachments), row
 
     # =========================
     # METADATA
@@ -104,19 +916,19 @@ class TeamsChatConverter:
         }
 
         try:
-            title = soup.find(class_=re.compile(r"chat-title", re.I))
+            title = soup.find(class_=_RE_CHAT_TITLE)
             if title:
                 metadata["conversation_title"] = title.get_text(" ", strip=True)
 
             for row in soup.find_all("tr"):
-                label_cell = row.find("td", class_=re.compile(r"chat-label|chat-header", re.I))
+                label_cell = row.find("td", class_=_RE_CHAT_LABEL)
                 if not label_cell:
                     continue
 
                 key_raw = label_cell.get_text(" ", strip=True)
                 key = self._normalize_label(key_raw)
 
-                data_cells = row.find_all("td", class_=re.compile(r"chat-data", re.I))
+                data_cells = row.find_all("td", class_=_RE_CHAT_DATA)
                 if not data_cells:
                     continue
 
@@ -151,7 +963,7 @@ class TeamsChatConverter:
         if not text:
             return ""
 
-        key = re.sub(r"\s+", " ", text.strip().lower())
+        key = _RE_WHITESPACE.sub(" ", text.strip().lower())
 
         mapping = {
             "display names": "display_names",
@@ -168,7 +980,7 @@ class TeamsChatConverter:
         return mapping.get(key, key.replace(" ", "_"))
 
     def _extract_display_names(self, cell) -> List[str]:
-        nested_names = cell.find_all("div", class_=re.compile(r"chat-data", re.I))
+        nested_names = cell.find_all("div", class_=_RE_CHAT_DATA)
         if nested_names:
             values = [n.get_text(" ", strip=True) for n in nested_names if n.get_text(" ", strip=True)]
             return values
@@ -190,122 +1002,54 @@ class TeamsChatConverter:
         threaded_chat = soup.select_one("div.threaded-chat") or soup.select_one("div#container")
         scope = threaded_chat if threaded_chat else soup
 
-        messages = scope.select(self.MESSAGE_WRAPPER_SELECTOR)
+        # Single find_all walk with one class regex instead of a
+        # three-branch soupsieve selector over the same scope.
+        messages = scope.find_all("label", class_=_RE_WRAPPER_CLASS)
         self.logger.info(f"Found {len(messages)} message elements")
         return messages
 
-    # =========================
-    # MESSAGE EXTRACTION
-    # =========================
-    def _extract_message_data(self, element, index: int, metadata: Dict[str, str]):
-        message_id = self._extract_message_id(element)
-        raw_timestamp = self._extract_raw_timestamp(element)
-        parsed_timestamp = self._parse_timestamp(raw_timestamp)
-
-        sender_text = self._extract_sender(element)
-        message_text = self._extract_message_text(element)
+    def _parse_timestamp_column(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Parse all raw timestamps in one vectorized pass over the column."""
+        if df.empty or "raw_timestamp" not in df.columns:
+            return df
 
-        if not any([message_id, raw_timestamp, sender_text, message_text]):
-            return None
+        parsed = pd.to_datetime(df["raw_timestamp"], errors="coerce", format="mixed")
 
-        return {
-            "index": index,
-            "message_id": message_id,
-            "raw_timestamp": raw_timestamp if raw_timestamp else "",
-            "timestamp": raw_timestamp if raw_timestamp else "",
-            "parsed_timestamp": parsed_timestamp,
-            "timestamp_parse_status": "OK" if parsed_timestamp is not None else "FAILED",
-            "sender": sender_text,
-            "recipients": metadata.get("conversation_participants", ""),
-            "message": message_text,
-            "conversation_title": metadata.get("conversation_title", ""),
-            "conversation_participants": metadata.get("conversation_participants", ""),
-            "participant_count": metadata.get("participant_count", ""),
-            "local_user": metadata.get("local_user", ""),
-            "message_count": metadata.get("message_count", ""),
-            "conversation_first_timestamp": metadata.get("conversation_first_timestamp", ""),
-            "conversation_last_timestamp": metadata.get("conversation_last_timestamp", ""),
-            "case_time_zone": metadata.get("case_time_zone", ""),
-            "source_file": self.html_file.name,
-            "message_hash": self._generate_hash(message_id, raw_timestamp, sender_text, message_text),
-        }
+        formatted = parsed.dt.strftime("%m/%d/%y %I:%M:%S.%f %p")
+        # Clip microseconds (6 digits) to milliseconds (3 digits), preserve AM/PM
+        formatted = formatted.str[:-6] + formatted.str[-3:]
 
-    def _extract_message_id(self, element) -> str:
-        raw_id = (element.get("id") or "").strip()
+        df["parsed_timestamp"] = formatted.where(parsed.notna(), None)
+        df["timestamp_parse_status"] = parsed.notna().map({True: "OK", False: "FAILED"})
 
-        if raw_id:
-            match = re.search(r"message(\d+)", raw_id, re.I)
-            if match:
-                return match.group(1)
-            return raw_id
-
-        checkbox = element.find("input", attrs={"value": True})
-        if checkbox:
-            value = (checkbox.get("value") or "").strip()
-            if value:
-                return value
-
-        nested = element.find(attrs={"id": True})
-        if nested:
-            nested_id = (nested.get("id") or "").strip()
-            match = re.search(r"message(\d+)", nested_id, re.I)
-            if match:
-                return match.group(1)
-            return nested_id
-
-        return ""
-
-    def _extract_sender(self, element) -> str:
-        found = element.find(class_=re.compile(r"message-sender", re.I))
-        if found:
-            return found.get_text(" ", strip=True)
-        return "Unknown"
-
-    def _extract_raw_timestamp(self, element) -> str:
-        found = element.find(class_=re.compile(r"message-date", re.I))
-        if found:
-            return found.get_text(" ", strip=True)
-        return ""
-
-    def _extract_message_text(self, element) -> str:
-        found = element.find(class_=re.compile(r"message-text", re.I))
-        if found:
-            return found.get_text(" ", strip=True)
-
-        bubble = element.find(class_=re.compile(r"(sent|received|unknown-direction)-message", re.I))
-        if bubble:
-            return bubble.get_text(" ", strip=True)
-
-        return ""
-
-    def _parse_timestamp(self, raw_timestamp: str):
-        if not raw_timestamp:
-            return None
-        try:
-            parsed_datetime = pd.to_datetime(raw_timestamp, errors="raise")
-            formatted = parsed_datetime.strftime("%m/%d/%y %I:%M:%S.%f %p")
-            # Clip microseconds (6 digits) to milliseconds (3 digits), preserve AM/PM
-            return formatted[:-6] + formatted[-3:]
-        except Exception as e:
-            self.logger.warning(f"Failed to parse timestamp {raw_timestamp}: {e}")
-            return None
+        failures = int((parsed.isna() & (df["raw_timestamp"] != "")).sum())
+        if failures:
+            self.logger.warning(f"Failed to parse {failures} timestamps")
 
-    def _generate_hash(self, message_id: str, raw_timestamp: str, sender: str, message: str) -> str:
-        raw = f"{message_id}|{raw_timestamp}|{sender}|{message}".encode("utf-8")
-        return hashlib.md5(raw).hexdigest()
+        return df
 
     # =========================
     # DUPES + DRIFT
     # =========================
     def remove_duplicates(self, df: pd.DataFrame) -> pd.DataFrame:
-        if df.empty or "message_hash" not in df.columns:
+        if df.empty:
+            return df
+
+        subset = [c for c in _DEDUP_COLUMNS if c in df.columns]
+        if not subset:
             return df
 
         before = len(df)
-        df = df.drop_duplicates(subset=["message_hash"], keep="first").reset_index(drop=True)
+        # Let pandas hash the raw columns in its own C hash table; the
+        # audit hash is computed once on the surviving rows below.
+        df = df.drop_duplicates(subset=subset, keep="first").reset_index(drop=True)
         removed = before - len(df)
-        self.stats["duplicates_removed"] = removed
+        # Additive: the parse loops already drop exact duplicates they
+        # see, and this pass catches any remaining (e.g. combined input).
+        self.stats["duplicates_removed"] += removed
         self.logger.info(f"Removed {removed} duplicate messages")
+
+        df["message_hash"] = _hash_rows(df[subset])
         return df
 
     def check_timestamp_drift(self, df: pd.DataFrame, threshold_seconds: int = 300) -> pd.DataFrame:
@@ -317,89 +1061,118 @@ class TeamsChatConverter:
         df["timestamp_drift_detail"] = ""
         df["timestamp_drift_seconds"] = ""
 
+        # One vectorized diff over the valid timestamps instead of a
+        # Python loop with per-pair .loc lookups.
         parsed = pd.to_datetime(df["parsed_timestamp"], errors="coerce")
-        valid_idx = parsed.dropna().index.tolist()
+        diffs = parsed.dropna().diff().dt.total_seconds()
+        drift_idx = diffs.index[diffs.abs() > threshold_seconds]
 
-        for i in range(1, len(valid_idx)):
-            prev_idx = valid_idx[i - 1]
-            curr_idx = valid_idx[i]
+        if len(drift_idx):
+            df.loc[drift_idx, "timestamp_drift_flag"] = "YES"
+            df.loc[drift_idx, "timestamp_drift_detail"] = (
+                f"Gap from previous parsed timestamp exceeds {threshold_seconds} seconds"
+            )
+            df.loc[drift_idx, "timestamp_drift_seconds"] = diffs.loc[drift_idx].astype(int)
+            self.stats["timestamp_drifts"] += len(drift_idx)
 
-            prev_ts = parsed.loc[prev_idx]
-            curr_ts = parsed.loc[curr_idx]
+        return df
 
-            diff = (curr_ts - prev_ts).total_seconds()
-            if abs(diff) > threshold_seconds:
-                df.loc[curr_idx, "timestamp_drift_flag"] = "YES"
-                df.loc[curr_idx, "timestamp_drift_detail"] = (
-                    f"Gap from previous parsed timestamp exceeds {threshold_seconds} seconds"
-                )
-                df.loc[curr_idx, "timestamp_drift_seconds"] = int(diff)
-                self.stats["timestamp_drifts"] += 1
+    def flag_near_duplicates(self, df: pd.DataFrame, minhash_threshold: float = 0.85, num_perm: int = 128) -> pd.DataFrame:
+        """Flag near-duplicate messages (retries, edited copies, quoted replies).
 
+        Uses MinHash + LSH banding over character 3-grams of the normalized
+        message text, so candidate pairs are found by bucket lookup instead
+        of O(N^2) pairwise comparison. Rows are only flagged, never removed;
+        each flagged row points at the earliest row of its duplicate group.
+        Requires the optional datasketch package; no-op without it.
+        """
+        if df.empty or "message" not in df.columns:
+            return df
+
+        if MinHash is None:
+            self.logger.info("datasketch not installed, skipping near-duplicate detection")
+            return df
+
+        df = df.copy()
+        df["near_duplicate_flag"] = ""
+        df["near_duplicate_of"] = ""
+
+        lsh = MinHashLSH(threshold=minhash_threshold, num_perm=num_perm)
+        roots = {}
+
+        for idx, message in df["message"].items():
+            text = _RE_WHITESPACE.sub(" ", str(message).lower()).strip()
+            if len(text) < 3:
+                continue
+
+            m = MinHash(num_perm=num_perm)
+            for i in range(len(text) - 2):
+                m.update(text[i:i + 3].encode("utf-8"))
+
+            matches = lsh.query(m)
+            if matches:
+                root = min(roots.get(match, match) for match in matches)
+                roots[idx] = root
+                df.at[idx, "near_duplicate_flag"] = "YES"
+                df.at[idx, "near_duplicate_of"] = str(root)
+                self.stats["near_duplicates"] += 1
+
+            lsh.insert(idx, m)
+
+        self.logger.info(f"Flagged {self.stats['near_duplicates']} near-duplicate messages")
         return df
 
     # =========================
-    # END-TO-END
+    # EXPORT
     # =========================
-    def convert(self) -> Tuple[str, str]:
-        df = self.parse_html()
-        df = self.remove_duplicates(df)
-        df = self.check_timestamp_drift(df)
+    def save_to_excel(self, df: pd.DataFrame, output_format: str = "xlsx") -> str:
+        stem = f"{self.html_file.stem}_converted_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        export_df = _prepare_export_df(df, _EXPORT_COLUMNS)
 
-        output_file = self.output_dir / f"{self.html_file.stem}_converted_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-
-        export_df = df.copy()
-
-        if "parsed_timestamp" in export_df.columns:
-            export_df["parsed_timestamp"] = export_df["parsed_timestamp"].fillna("")
-
-        if "timestamp" in export_df.columns:
-            ts = pd.to_datetime(export_df["timestamp"], errors="coerce")
-            export_df["timestamp"] = ts.dt.strftime("%Y-%m-%d %H:%M:%S").fillna(export_df["timestamp"])
-
-        preferred_columns = [
-            "sender",
-            "recipients",
-            "message",
-            "timestamp",
-            "message_id",
-            "source_file",
-            "parsed_timestamp",
-            "timestamp_parse_status",
-            "timestamp_drift_flag",
-            "timestamp_drift_detail",
-            "timestamp_drift_seconds",
-            "message_hash",
-            "conversation_title",
-            "conversation_participants",
-            "participant_count",
-            "local_user",
-            "message_count",
-            "conversation_first_timestamp",
-            "conversation_last_timestamp",
-            "case_time_zone",
-            "index",
-            "raw_timestamp",
-        ]
-        existing_columns = [c for c in preferred_columns if c in export_df.columns]
-        export_df = export_df[existing_columns]
-
-        with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
-            export_df.to_excel(writer, index=False, sheet_name="Messages")
-
-            stats_df = pd.DataFrame(
-                [
-                    {"metric": "source_file", "value": self.html_file.name},
-                    {"metric": "total_messages", "value": self.stats["total_messages"]},
-                    {"metric": "duplicates_removed", "value": self.stats["duplicates_removed"]},
-                    {"metric": "timestamp_drifts", "value": self.stats["timestamp_drifts"]},
-                    {"metric": "errors", "value": self.stats["errors"]},
-                ]
+        # CSV fast path: plain row serialization, no OOXML container to
+        # assemble, typically an order of magnitude quicker on big runs.
+        if output_format == "csv":
+            output_file = self.output_dir / f"{stem}.csv"
+            export_df.to_csv(output_file, index=False)
+            self.logger.info(f"Saved CSV: {output_file}")
+            return str(output_file)
+
+        output_file = self.output_dir / f"{stem}.xlsx"
+
+        stats_df = pd.DataFrame(
+            [
+                {"metric": "source_file", "value": self.html_file.name},
+                {"metric": "total_messages", "value": self.stats["total_messages"]},
+                {"metric": "duplicates_removed", "value": self.stats["duplicates_removed"]},
+                {"metric": "timestamp_drifts", "value": self.stats["timestamp_drifts"]},
+                {"metric": "near_duplicates", "value": self.stats["near_duplicates"]},
+                {"metric": "errors", "value": self.stats["errors"]},
+            ]
+        )
+        sheets = [("Messages", export_df), ("Stats", stats_df)]
+
+        if self.url_counts:
+            url_summary = pd.DataFrame(
+                [(url, count, _classify_url(url)) for url, count in self.url_counts.most_common()],
+                columns=["url", "count", "type"],
             )
-            stats_df.to_excel(writer, index=False, sheet_name="Stats")
+            sheets.append(("URL Summary", url_summary))
+
+        _write_workbook(output_file, sheets)
 
         self.logger.info(f"Saved workbook: {output_file}")
-        return str(output_file), str(self.log_file)
+        return str(output_file)
+
+    # =========================
+    # END-TO-END
+    # =========================
+    def convert(self, output_format: str = "xlsx") -> Tuple[str, str]:
+        df = self.parse_html()
+        df = self.remove_duplicates(df)
+        df = self.check_timestamp_drift(df)
+        df = self.flag_near_duplicates(df)
+        output_file = self.save_to_excel(df, output_format=output_format)
+        return output_file, str(self.log_file)
 
 
 def convert_teams_chat(html_file: str, output_dir: str = None) -> Tuple[str, str]:
@@ -419,7 +1192,10 @@ def _iter_html_files(path_str: str, recursive: bool = False) -> List[Path]:
         if recursive:
             files = sorted([x for x in p.rglob("*.html") if x.is_file()])
         else:
-            files = sorted([x for x in p.glob("*.html") if x.is_file()])
+            # scandir's DirEntry caches the type bits from the directory
+            # read itself, so is_file() costs no extra stat per entry.
+            with os.scandir(p) as entries:
+                files = sorted(Path(e.path) for e in entries if e.name.endswith(".html") and e.is_file())
 
         files = sorted(set(files))
         if not files:
@@ -429,11 +1205,25 @@ def _iter_html_files(path_str: str, recursive: bool = False) -> List[Path]:
     raise FileNotFoundError(f"Input path not found: {p}")
 
 
+def _convert_file_to_df(args) -> pd.DataFrame:
+    """Process-pool worker for folder mode: run one file through the
+    full per-file pipeline and hand the frame back to the parent."""
+    file_path, output_dir = args
+    c = TeamsChatConverter(file_path, output_dir)
+    df = c.parse_html()
+    df = c.remove_duplicates(df)
+    df = c.check_timestamp_drift(df)
+    df = c.flag_near_duplicates(df)
+    df["source_file"] = Path(file_path).name
+    return df
+
+
 def convert_teams_chat_folder(
     folder_path: str,
     output_dir: str = None,
     recursive: bool = False,
     combine: bool = True,
+    output_format: str = "xlsx",
 ) -> Tuple[str, str]:
     html_files = _iter_html_files(folder_path, recursive=recursive)
 
@@ -447,23 +1237,30 @@ def convert_teams_chat_folder(
             last_excel, last_log = convert_teams_chat(str(f), output_dir=output_dir)
         return last_excel, last_log
 
-    dfs = []
-    for f in html_files:
-        c = TeamsChatConverter(str(f), output_dir)
-        df = c.parse_html()
-        df = c.remove_duplicates(df)
-        df = c.check_timestamp_drift(df)
-        df["source_file"] = f.name
-        dfs.append(df)
+    # Files are independent, so multi-file folders fan out across a
+    # process pool (ex.map keeps the file order). A single file is not
+    # worth the pool startup; pool failures fall back to the serial loop.
+    jobs = [(str(f), output_dir) for f in html_files]
+    dfs = None
+    if len(jobs) > 1:
+        try:
+            with ProcessPoolExecutor() as pool:
+                dfs = list(pool.map(_convert_file_to_df, jobs))
+        except Exception as e:
+            master.logger.warning(f"Parallel folder conversion unavailable ({e}), processing serially")
+            dfs = None
+    if dfs is None:
+        dfs = [_convert_file_to_df(job) for job in jobs]
 
     if not dfs:
         raise ValueError("No messages extracted from any HTML file in the folder.")
 
     combined = pd.concat(dfs, ignore_index=True)
 
-    if "message_hash" in combined.columns:
+    subset = [c for c in _DEDUP_COLUMNS if c in combined.columns]
+    if subset:
         before = len(combined)
-        combined = combined.drop_duplicates(subset=["message_hash"], keep="first").reset_index(drop=True)
+        combined = combined.drop_duplicates(subset=subset, keep="first").reset_index(drop=True)
         removed = before - len(combined)
         master.logger.info(f"Global duplicates removed: {removed}")
 
@@ -472,58 +1269,28 @@ def convert_teams_chat_folder(
     out_dir = Path(output_dir).expanduser().resolve() if output_dir else Path(folder_path).expanduser().resolve()
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    combined_file = out_dir / f"teams_chats_combined_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-
-    export_df = combined.copy()
-
-    if "parsed_timestamp" in export_df.columns:
-        export_df["parsed_timestamp"] = export_df["parsed_timestamp"].fillna("")
+    combined_stem = f"teams_chats_combined_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
 
-    if "timestamp" in export_df.columns:
-        ts = pd.to_datetime(export_df["timestamp"], errors="coerce")
-        export_df["timestamp"] = ts.dt.strftime("%Y-%m-%d %H:%M:%S").fillna(export_df["timestamp"])
+    export_df = _prepare_export_df(combined, ["global_sequence"] + _EXPORT_COLUMNS)
 
-    preferred_columns = [
-        "global_sequence",
-        "sender",
-        "recipients",
-        "message",
-        "timestamp",
-        "message_id",
-        "source_file",
-        "parsed_timestamp",
-        "timestamp_parse_status",
-        "timestamp_drift_flag",
-        "timestamp_drift_detail",
-        "timestamp_drift_seconds",
-        "message_hash",
-        "conversation_title",
-        "conversation_participants",
-        "participant_count",
-        "local_user",
-        "message_count",
-        "conversation_first_timestamp",
-        "conversation_last_timestamp",
-        "case_time_zone",
-        "index",
-        "raw_timestamp",
-    ]
-    existing_columns = [c for c in preferred_columns if c in export_df.columns]
-    export_df = export_df[existing_columns]
+    if output_format == "csv":
+        combined_file = out_dir / f"{combined_stem}.csv"
+        export_df.to_csv(combined_file, index=False)
+        master.logger.info(f"Saved combined CSV: {combined_file}")
+        return str(combined_file), str(master.log_file)
 
-    with pd.ExcelWriter(combined_file, engine="openpyxl") as writer:
-        export_df.to_excel(writer, index=False, sheet_name="All Messages")
+    combined_file = out_dir / f"{combined_stem}.xlsx"
 
-        summary = pd.DataFrame(
-            [
-                {
-                    "source_file": d["source_file"].iloc[0] if (d is not None and not d.empty and "source_file" in d.columns) else "empty_or_failed_parse",
-                    "messages": len(d) if d is not None else 0,
-                }
-                for d in dfs if d is not None
-            ]
-        )
-        summary.to_excel(writer, index=False, sheet_name="Input Summary")
+    summary = pd.DataFrame(
+        [
+            {
+                "source_file": d["source_file"].iloc[0] if (d is not None and not d.empty and "source_file" in d.columns) else "empty_or_failed_parse",
+                "messages": len(d) if d is not None else 0,
+            }
+            for d in dfs if d is not None
+        ]
+    )
+    _write_workbook(combined_file, [("All Messages", export_df), ("Input Summary", summary)])
 
     master.logger.info(f"Saved combined workbook: {combined_file}")
     return str(combined_file), str(master.log_file)
@@ -531,11 +1298,15 @@ def convert_teams_chat_folder(
 
 if __name__ == "__main__":
     import argparse
+    import multiprocessing
+
+    multiprocessing.freeze_support()
 
     parser = argparse.ArgumentParser(description="Convert Purview Teams HTML chat exports to Excel")
     parser.add_argument("input_path", help="Path to HTML file or folder of HTML files")
     parser.add_argument("-o", "--output-dir", default=None, help="Output directory")
     parser.add_argument("-r", "--recursive", action="store_true", help="Search subfolders for HTML files")
+    parser.add_argument("-f", "--format", choices=["xlsx", "csv"], default="xlsx", help="Output format (csv skips workbook assembly)")
 
     args = parser.parse_args()
 
@@ -545,9 +1316,11 @@ if __name__ == "__main__":
             output_dir=args.output_dir,
             recursive=args.recursive,
             combine=True,
+            output_format=args.format,
         )
     else:
-        excel_file, log_file = convert_teams_chat(args.input_path, output_dir=args.output_dir)
+        converter = TeamsChatConverter(args.input_path, args.output_dir)
+        excel_file, log_file = converter.convert(output_format=args.format)
 
-    print(f"Excel Output: {excel_file}")
+    print(f"Output: {excel_file}")
     print(f"Log File: {log_file}")
@@ -15,6 +15,7 @@ Supports:
 from __future__ import annotations
 
 import argparse
+import multiprocessing
 from pathlib import Path
 from typing import List, Tuple
 
@@ -197,4 +198,5 @@ def run():
 # SCRIPT ENTRY
 # ---------------------------------------------------------
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     raise SystemExit(main())
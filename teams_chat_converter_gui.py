@@ -2,19 +2,32 @@
 
 from __future__ import annotations
 
+import multiprocessing
 import os
+import queue
 import sys
 import threading
 import tkinter as tk
 from pathlib import Path
 from tkinter import filedialog, messagebox, scrolledtext
 
-try:
-    from teams_chat_converter import convert_teams_chat, convert_teams_chat_folder
-except ImportError:  # pragma: no cover
-    import teams_chat_converter  # type: ignore
-    convert_teams_chat = teams_chat_converter.convert_teams_chat  # type: ignore
-    convert_teams_chat_folder = teams_chat_converter.convert_teams_chat_folder  # type: ignore
+# Imported lazily: pulling in teams_chat_converter means importing
+# pandas/bs4/openpyxl (~0.5s+), which the GUI does not need until a
+# conversion actually starts. The worker thread triggers the import, so
+# even that cost never blocks the Tk event loop.
+convert_teams_chat = None
+convert_teams_chat_folder = None
+
+
+def _load_converter():
+    global convert_teams_chat, convert_teams_chat_folder
+    if convert_teams_chat is None:
+        from teams_chat_converter import (  # noqa: F811
+            convert_teams_chat as _convert_file,
+            convert_teams_chat_folder as _convert_folder,
+        )
+        convert_teams_chat = _convert_file
+        convert_teams_chat_folder = _convert_folder
 
 
 class ConverterGUI:
@@ -31,7 +44,13 @@ class ConverterGUI:
         self.mode_var = tk.StringVar(value="file")
         self.recursive_var = tk.BooleanVar(value=False)
 
+        # Log lines go through a queue drained on the Tk thread: worker
+        # threads must not touch widgets, and batching the inserts keeps
+        # redraws at ~10/s instead of one full flush per line.
+        self.log_queue: queue.Queue[str] = queue.Queue()
+
         self.setup_ui()
+        self.root.after(100, self._drain_log_queue)
 
     def setup_ui(self):
         title_label = tk.Label(
@@ -222,11 +241,24 @@ class ConverterGUI:
         self.log_message(f"Input selected: {path}")
 
     def log_message(self, message: str):
-        self.status_text.config(state=tk.NORMAL)
-        self.status_text.insert(tk.END, message + "\n")
-        self.status_text.see(tk.END)
-        self.status_text.config(state=tk.DISABLED)
-        self.root.update_idletasks()
+        """Thread-safe: queue the line for the Tk-thread drain loop."""
+        self.log_queue.put(message)
+
+    def _drain_log_queue(self):
+        lines = []
+        try:
+            while len(lines) < 500:
+                lines.append(self.log_queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        if lines:
+            self.status_text.config(state=tk.NORMAL)
+            self.status_text.insert(tk.END, "\n".join(lines) + "\n")
+            self.status_text.see(tk.END)
+            self.status_text.config(state=tk.DISABLED)
+
+        self.root.after(100, self._drain_log_queue)
 
     def start_conversion(self):
         if not self.selected_path or self.is_converting:
@@ -246,6 +278,7 @@ class ConverterGUI:
 
     def run_conversion(self):
         try:
+            _load_converter()
             input_path = self.selected_path
             output_dir = str(self.output_dir) if self.output_dir else None
 
@@ -332,4 +365,8 @@ def main():
 
 
 if __name__ == "__main__":
+    # In the frozen (PyInstaller) exe, process-pool workers re-execute
+    # this script; freeze_support() diverts them into worker bootstrap
+    # instead of opening another GUI window.
+    multiprocessing.freeze_support()
     main()